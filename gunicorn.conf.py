@@ -0,0 +1,27 @@
+# gunicorn 설정 (실행 디렉터리의 gunicorn.conf.py를 자동으로 읽음)
+# Render 시작 명령: gunicorn app:app
+# preload_app으로 앱을 먼저 import하므로, ssl/socket 등이 import되기 전에 가장 먼저 패치
+from gevent import monkey
+monkey.patch_all()
+
+import gc
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+
+# DART/Gemini/뉴스 호출은 대부분 I/O 대기 → gevent 워커로 워커당 여러 요청을 동시에 처리
+# (모든 requests 호출에 timeout을 지정해 두었으므로 green thread가 무한 대기하지 않음)
+worker_class = 'gevent'
+workers = int(os.getenv('WEB_CONCURRENCY', '2'))
+# helpers가 같은 환경변수로 연결 풀/스레드 풀 크기를 맞춤
+worker_connections = int(os.getenv('WORKER_CONNECTIONS', '100'))
+
+# 앱을 마스터에서 한 번만 import한 뒤 fork
+preload_app = True
+
+def when_ready(server):
+    """워커 fork 전에 기업 목록을 로드해 모든 워커가 같은 메모리를 공유하도록 함"""
+    from helpers import get_corp_automaton
+    get_corp_automaton()
+    # 지금까지 만든 객체를 GC 추적 대상에서 빼서, 워커의 GC가 공유 페이지에 쓰기(CoW 복사)를 일으키지 않도록 함
+    gc.freeze()
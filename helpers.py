@@ -0,0 +1,738 @@
+import os
+import re
+import json
+import pickle
+import hashlib
+import logging
+import time
+import functools
+import bisect
+from array import array
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import requests
+from requests.adapters import HTTPAdapter, Retry
+from dotenv import load_dotenv
+from lxml import etree, html as lxml_html
+from cachetools import TTLCache
+import diskcache
+import ijson
+import ahocorasick
+import orjson
+
+# ----------------------------
+# 1. 기본 설정 및 환경변수
+# ----------------------------
+load_dotenv() # .env 파일 로드
+
+logger = logging.getLogger(__name__)
+
+# === API 키 가져오기 ===
+DART_API_KEY = os.getenv('DART_API_KEY')
+GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
+GEMINI_MODEL = os.getenv('GEMINI_MODEL', 'gemini-2.5-flash-preview-09-2025')
+
+# HTTP 세션 설정 (재시도 로직 포함)
+session = requests.Session()
+session.headers.update({
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+})
+retries = Retry(total=3, backoff_factor=1.5, status_forcelist=[429, 500, 502, 503, 504])
+# 기본 풀(호스트당 10개)은 동시 요청 시 연결 대기가 생기므로 넉넉하게 확장
+# 호스트당 풀 크기는 gunicorn worker_connections(100)에 맞춤: 동시 요청이 풀보다 많으면
+# 초과분 연결은 사용 후 버려져 다음 요청에서 TCP/TLS 핸드셰이크를 다시 하게 됨
+WORKER_CONNECTIONS = int(os.getenv('WORKER_CONNECTIONS', '100'))  # gunicorn.conf.py와 같은 값 (워커당 동시 요청 수)
+HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', str(WORKER_CONNECTIONS)))
+adapter = HTTPAdapter(pool_connections=10, pool_maxsize=HTTP_POOL_SIZE, max_retries=retries)
+session.mount('https://', adapter)
+session.mount('http://', adapter)
+
+# ----------------------------
+# 2. 데이터 로드 (CORPCODE.xml)
+# ----------------------------
+CORP_XML_PATH = 'CORPCODE.xml'
+CORP_PKL_PATH = 'CORPCODE.pkl'  # XML 파싱 결과 캐시 (XML보다 최신일 때만 사용)
+CORP_PKL_VERSION = 4  # 저장 형식/기업명 정규화 방식이 바뀌면 올려서 기존 캐시를 무시
+CORP_CODE_LEN = 8  # DART corp_code는 항상 8자리 숫자
+
+# 기업명 정규화: '(주)' 제거 + 전각/넓은 공백을 일반 공백으로
+PAREN_JU = '(주)'
+NORMALIZE_TABLE = str.maketrans({'\u3000': ' ', '\xa0': ' '})
+
+def normalize_corp_name(name):
+    """XML 로드와 검색에서 공통으로 쓰는 기업명 정규화"""
+    return name.replace(PAREN_JU, '').translate(NORMALIZE_TABLE).strip()
+
+# 별칭: '주식회사' 제거 + 영문 소문자 (예: '주식회사 카카오' → '카카오', 'NAVER' → 'naver')
+JUSIK_HOESA = '주식회사'
+
+def corp_name_alias(clean_name):
+    """정규화된 기업명의 별칭 (로드 시 인덱스에 함께 넣고, 검색 시 정확히 일치하지 않으면 조회)"""
+    return clean_name.replace(JUSIK_HOESA, '').strip().lower()
+
+class CorpIndex:
+    """기업 검색 인덱스: 항목별 dict/tuple 대신 열 단위 배열(SoA)로 보관
+    - names: 정규화된 기업명 (정렬됨, 이진 탐색)
+    - codes: 8자리 corp_code를 순서대로 이어 붙인 bytes
+    - originals: 원본 기업명
+    - names_blob / offsets: 부분 문자열 검색용으로 기업명을 '\n'으로 이어 붙인 문자열과 각 이름의 시작 위치"""
+    def __init__(self, names, codes, originals):
+        self.names = names
+        self.codes = codes
+        self.originals = originals
+        self.names_blob = '\n'.join(names)
+        self.offsets = array('L')
+        pos = 0
+        for name in names:
+            self.offsets.append(pos)
+            pos += len(name) + 1
+
+    def __len__(self):
+        return len(self.names)
+
+    def find(self, clean_name):
+        """정확히 일치하는 기업의 위치 (없으면 -1)"""
+        i = bisect.bisect_left(self.names, clean_name)
+        if i < len(self.names) and self.names[i] == clean_name: return i
+        return -1
+
+    def find_containing(self, query):
+        """검색어를 포함하는 기업 중 이름이 가장 짧은(검색어와 가장 가까운) 기업의 위치 (접두사 일치 우선, 없으면 -1)"""
+        if len(query) < 2 or '\n' in query: return -1
+        # 1. 검색어로 시작하는 기업명: 정렬 배열에서 연속된 구간
+        lo = bisect.bisect_left(self.names, query)
+        hi = bisect.bisect_left(self.names, query + '\U0010ffff', lo)
+        if lo < hi: return min(range(lo, hi), key=lambda i: len(self.names[i]))
+        # 2. 중간에 포함하는 기업명: 이어 붙인 문자열에서 C 수준 str.find로 모든 위치를 찾음
+        best = -1
+        pos = self.names_blob.find(query)
+        while pos >= 0:
+            i = bisect.bisect_right(self.offsets, pos) - 1
+            if best < 0 or len(self.names[i]) < len(self.names[best]): best = i
+            # 같은 이름 안의 다음 위치는 건너뛰고 다음 기업명부터 찾음
+            pos = self.names_blob.find(query, self.offsets[i] + len(self.names[i]) + 1)
+        return best
+
+    def code(self, i):
+        return self.codes[i * CORP_CODE_LEN:(i + 1) * CORP_CODE_LEN].decode('ascii')
+
+class CorpTarget:
+    """lxml 파서 타깃: Element 생성 없이 <list> 단위로 기업명/코드를 열 단위 배열에 바로 수집"""
+    FIELDS = ('corp_name', 'corp_code')
+
+    def __init__(self):
+        self.positions = {}  # 정규화된 기업명 → 배열 위치 (같은 이름은 나중 항목으로 덮어씀)
+        self.names = []
+        self.codes = []
+        self.originals = []
+        self.cur = None
+        self.buf = []  # 텍스트가 여러 조각으로 나뉘어 들어올 수 있으므로 모아서 합침
+        self.row = {}
+
+    def start(self, tag, attrib):
+        self.cur = tag if tag in self.FIELDS else None
+
+    def data(self, data):
+        if self.cur: self.buf.append(data)
+
+    def end(self, tag):
+        if tag == self.cur:
+            self.row[tag] = ''.join(self.buf).strip()
+            self.buf.clear()
+        self.cur = None
+        if tag != 'list': return
+
+        c_name = self.row.get('corp_name')
+        c_code = self.row.get('corp_code', '')
+        if c_name and len(c_code) == CORP_CODE_LEN and c_code.isascii():
+            clean_name = normalize_corp_name(c_name)
+            # 원본명이 정규화명과 같으면 같은 문자열 객체를 공유
+            original = clean_name if c_name == clean_name else c_name
+            i = self.positions.get(clean_name)
+            if i is None:
+                self.positions[clean_name] = len(self.names)
+                self.names.append(clean_name)
+                self.codes.append(c_code)
+                self.originals.append(original)
+            else:
+                self.codes[i] = c_code
+                self.originals[i] = original
+        self.row.clear()
+
+    def close(self):
+        """별칭을 추가하고 기업명 순으로 정렬한 CorpIndex 반환"""
+        # 별칭은 같은 이름의 실제 기업이 없을 때만 추가 (코드/원본명 문자열은 원래 항목과 공유)
+        for i in range(len(self.names)):
+            alias = corp_name_alias(self.names[i])
+            if alias and alias not in self.positions:
+                self.positions[alias] = len(self.names)
+                self.names.append(alias)
+                self.codes.append(self.codes[i])
+                self.originals.append(self.originals[i])
+        order = sorted(range(len(self.names)), key=self.names.__getitem__)
+        return CorpIndex(
+            [self.names[i] for i in order],
+            ''.join(self.codes[i] for i in order).encode('ascii'),
+            [self.originals[i] for i in order],
+        )
+
+def load_corp_index():
+    """기업 목록 로드 → CorpIndex"""
+    xml_exists = os.path.exists(CORP_XML_PATH)
+
+    # 1. pickle 캐시가 XML보다 최신이면 파싱 없이 바로 로드
+    if os.path.exists(CORP_PKL_PATH) and (not xml_exists or os.path.getmtime(CORP_PKL_PATH) >= os.path.getmtime(CORP_XML_PATH)):
+        try:
+            with open(CORP_PKL_PATH, 'rb') as f:
+                version, *arrays = pickle.load(f)
+            if version == CORP_PKL_VERSION:
+                index = CorpIndex(*arrays)
+                logger.info(f"기업 정보 캐시 로드 완료: {len(index)}개")
+                return index
+            logger.info("기업 정보 캐시 버전이 달라 XML을 다시 파싱합니다.")
+        except Exception as e:
+            logger.warning(f"캐시 로드 실패, XML을 다시 파싱합니다: {e}")
+
+    if not xml_exists:
+        logger.warning("CORPCODE.xml 파일이 없습니다. 기업 검색 기능이 제한됩니다.")
+        return CorpIndex([], b'', [])
+
+    # 2. XML 파싱
+    logger.info(f"파일 로드 중: {CORP_XML_PATH}")
+    index = etree.parse(CORP_XML_PATH, etree.XMLParser(target=CorpTarget()))
+    logger.info(f"기업 정보 로드 완료: {len(index)}개")
+
+    # 3. 다음 기동을 위해 pickle로 저장 (임시 파일에 쓰고 교체해 워커 간 충돌 방지)
+    try:
+        tmp_path = f"{CORP_PKL_PATH}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump((CORP_PKL_VERSION, index.names, index.codes, index.originals), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, CORP_PKL_PATH)
+    except OSError as e:
+        logger.warning(f"기업 정보 캐시 저장 실패: {e}")
+    return index
+
+def build_corp_automaton(index):
+    """검색어 안에 포함된 기업명을 찾기 위한 Aho-Corasick 오토마톤 (값: 인덱스 위치, 기업이 없으면 None)"""
+    automaton = ahocorasick.Automaton()
+    for i, clean_name in enumerate(index.names):
+        # 한 글자 기업명은 거의 모든 검색어에 걸리므로 제외
+        if len(clean_name) >= 2: automaton.add_word(clean_name, i)
+    if len(automaton) == 0: return None
+    automaton.make_automaton()
+    return automaton
+
+# import 시점이 아니라 최초 사용 시 1회 로드
+# (gunicorn.conf.py에서 fork 전에 호출해 워커들이 copy-on-write로 공유)
+@functools.lru_cache(maxsize=1)
+def get_corp_index():
+    try:
+        return load_corp_index()
+    except Exception as e:
+        logger.error(f"XML 로드 에러: {e}")
+        return CorpIndex([], b'', [])
+
+@functools.lru_cache(maxsize=1)
+def get_corp_automaton():
+    return build_corp_automaton(get_corp_index())
+
+# 검색어 안에서 찾은 기업명이 검색어 길이의 이 비율 이상일 때만 사용 (예: '대상포진' → '대상'은 제외)
+PARTIAL_MATCH_MIN_RATIO = 0.6
+
+def find_corp(name):
+    """기업명 검색 → {'corp_code', 'corp_name', 'match'} (없으면 None)
+    부분 일치는 추정 결과이므로 match='partial'로 정확히 일치('exact')하는 경우와 구분"""
+    clean_name = normalize_corp_name(name)
+    index = get_corp_index()
+    corp_automaton = get_corp_automaton()
+    i = index.find(clean_name)
+    match = 'exact'
+    if i < 0:
+        # 별칭으로 조회 (예: '주식회사 카카오', 'naver')
+        i = index.find(corp_name_alias(clean_name))
+    if i < 0:
+        match = 'partial'
+    if i < 0 and corp_automaton is not None:
+        # 정확히 일치하는 기업이 없으면 검색어에 포함된 기업명 중 가장 긴 것을 사용
+        # 예: '현대자동차 주가' → '현대자동차' (검색어의 일부만 겹치는 짧은 기업명은 제외)
+        matches = [pos for _, pos in corp_automaton.iter(clean_name)]
+        if matches:
+            pos = max(matches, key=lambda pos: len(index.names[pos]))
+            if len(index.names[pos]) >= len(clean_name) * PARTIAL_MATCH_MIN_RATIO: i = pos
+    if i < 0:
+        # 그래도 없으면 검색어를 포함하는 기업명 (예: '삼성' → '삼성전자')
+        i = index.find_containing(clean_name)
+    if i < 0: return None
+    return {'corp_code': index.code(i), 'corp_name': index.originals[i], 'match': match}
+
+# ----------------------------
+# 3. 헬퍼 함수들
+# ----------------------------
+DART_API_URL = 'https://opendart.fss.or.kr/api'
+GEMINI_URL_BASE = 'https://generativelanguage.googleapis.com/v1beta/models'
+GEMINI_TIMEOUT = 60  # Gemini 응답 대기 한도(초, 연결부터 스트림 끝까지 전체)
+# 호출마다 바뀌지 않는 부분은 미리 만들어 둠 (키가 없으면 URL도 없음 → 호출 건너뜀)
+GEMINI_STREAM_URL = f"{GEMINI_URL_BASE}/{GEMINI_MODEL}:streamGenerateContent?key={GEMINI_API_KEY}" if GEMINI_API_KEY else None
+GEMINI_HEADERS = {'Content-Type': 'application/json'}
+GEMINI_GENERATION_CONFIG = {"temperature": 0.4, "maxOutputTokens": 4096, "responseMimeType": "application/json"}  # JSON 응답 강제
+
+# 기업 분석 응답 스키마 (Gemini responseSchema, OpenAPI 형식)
+# 프롬프트에 JSON 예시를 넣는 대신 구조화 출력으로 강제 → 입력 토큰 감소, JSON 복구 요청 불필요
+# 분석 캐시 키에 스키마 해시가 들어가므로 스키마를 바꾸면 분석 캐시만 자동으로 갈림
+def schema_object(*keys, **props):
+    """모든 필드가 필수인 OBJECT 스키마 (keys는 문자열 필드, 선언 순서대로 생성)"""
+    props = {**{k: {"type": "STRING"} for k in keys}, **props}
+    return {"type": "OBJECT", "properties": props, "required": list(props), "propertyOrdering": list(props)}
+
+STRING_LIST = {"type": "ARRAY", "items": {"type": "STRING"}}
+ANALYSIS_SCHEMA = schema_object(
+    'vision',
+    productsAndServices=STRING_LIST,
+    performanceSummary={"type": "STRING"},
+    swot=schema_object('strategy', strength=STRING_LIST, weakness=STRING_LIST, opportunity=STRING_LIST, threat=STRING_LIST),
+    industryAnalysis=schema_object('method', 'result', 'competitors', 'competitorAnalysis'),
+    job=schema_object('duties', 'description', 'knowledge', 'skills', 'attitude', 'certs', 'env', 'careerDev'),
+    selfAnalysis=schema_object('knowledge', 'skills', 'attitude', 'actionPlan1', 'actionPlan2', 'actionPlan3'),
+)
+# 기업 분석 프롬프트 (요청마다 다시 만들지 않도록 모듈 상수로 보관)
+ANALYSIS_PROMPT_TMPL = "기업 '{name}({biz})'을 프론트엔드 개발자 취업 준비생 관점에서 분석해줘. 모든 내용은 한글로 작성해."
+
+class CircuitBreakerError(Exception):
+    """차단기가 열려 있어 업스트림 호출을 건너뜀"""
+
+class CircuitBreaker:
+    """연속 실패 시 일정 시간 즉시 실패 처리해 워커가 타임아웃에 묶이지 않도록 하는 데코레이터
+    (상태 확인만 잠그고 호출 자체는 잠금 밖에서 실행 → 동시 요청이 직렬화되지 않음)"""
+    def __init__(self, fail_max, reset_timeout):
+        self.fail_max = fail_max
+        self.reset_timeout = reset_timeout
+        self.fail_count = 0
+        self.opened_at = None
+        self.lock = threading.Lock()
+
+    def __call__(self, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with self.lock:
+                if self.opened_at is not None:
+                    if time.monotonic() - self.opened_at < self.reset_timeout:
+                        raise CircuitBreakerError(func.__name__)
+                    # 반개방: 시험 호출 1건만 통과시키고 나머지는 계속 차단
+                    self.opened_at = time.monotonic()
+            try:
+                result = func(*args, **kwargs)
+            except Exception:
+                with self.lock:
+                    self.fail_count += 1
+                    if self.fail_count >= self.fail_max: self.opened_at = time.monotonic()
+                raise
+            with self.lock:
+                self.fail_count = 0
+                self.opened_at = None
+            return result
+        return wrapper
+
+class UpstreamError(Exception):
+    """업스트림 HTTP 오류 (요청 URL에 API 키가 들어가므로 메시지에 URL을 넣지 않음)"""
+    def __init__(self, service, status_code):
+        super().__init__(f"{service} API 오류 (HTTP {status_code})")
+        self.status_code = status_code
+
+def safe_error_message(e):
+    """클라이언트 응답/로그용 예외 메시지 (requests 예외는 API 키가 든 URL을 포함하므로 종류만 남김)"""
+    if isinstance(e, requests.RequestException): return f"외부 API 요청 실패 ({type(e).__name__})"
+    return str(e)
+
+# 업스트림별 서킷 브레이커
+dart_breaker = CircuitBreaker(fail_max=5, reset_timeout=30)
+gemini_breaker = CircuitBreaker(fail_max=5, reset_timeout=60)
+UPSTREAM_DOWN_MESSAGE = '외부 API 장애로 잠시 요청을 중단했습니다. 잠시 후 다시 시도해주세요.'
+
+# DART 응답 캐시 (기업개황/재무제표는 세션 동안 사실상 불변)
+# 응답 구조가 바뀌면 CACHE_VERSION을 올려 기존 캐시를 무효화
+CACHE_VERSION = 'v2'
+company_cache = TTLCache(maxsize=1024, ttl=3600)
+finance_cache = TTLCache(maxsize=4096, ttl=86400)
+cache_lock = threading.Lock()  # TTLCache는 스레드 안전하지 않음
+# 메모리 캐시 뒤의 2차 캐시 (워커/재시작 간 공유, 만료는 각 메모리 캐시의 TTL을 따름)
+DART_CACHE_DIR = os.getenv('DART_CACHE_DIR', '/tmp/dart-cache')
+dart_disk_cache = diskcache.Cache(DART_CACHE_DIR)
+
+# Gemini 결과 캐시 (동일 프롬프트 재생성 방지, 워커/재시작 간 공유되도록 디스크에 저장)
+GEMINI_CACHE_DIR = os.getenv('GEMINI_CACHE_DIR', '/tmp/gemini-cache')
+GEMINI_CACHE_TTL = 7 * 86400
+gemini_cache = diskcache.Cache(GEMINI_CACHE_DIR)
+
+# diskcache는 sqlite 연결을 threading.local에 두는데, gevent 패치 후에는 greenlet마다 따로 연결을 엶
+# 요청 greenlet에서 바로 쓰면 요청마다 연결을 새로 열고 그동안 워커의 이벤트 루프 전체가 멈추므로
+# 디스크 캐시는 수명이 긴 전용 스레드(gevent에서는 greenlet)에서만 접근해 연결을 재사용
+disk_pool = ThreadPoolExecutor(max_workers=4)
+
+def disk_get(cache, key, **kwargs):
+    """디스크 캐시 조회 (disk_pool에서 실행)"""
+    return disk_pool.submit(cache.get, key, **kwargs).result()
+
+def disk_set(cache, key, value, **kwargs):
+    """디스크 캐시 저장 (disk_pool에서 실행)"""
+    return disk_pool.submit(cache.set, key, value, **kwargs).result()
+
+def gemini_cache_key(kind, prompt, schema=None):
+    """프롬프트 해시 기반 캐시 키 (모델이나 responseSchema가 바뀌면 다른 키)"""
+    key_text = f"{GEMINI_MODEL}\n{prompt}"
+    if schema is not None: key_text += "\n" + orjson.dumps(schema).decode()
+    digest = hashlib.blake2b(key_text.encode('utf-8'), digest_size=16).hexdigest()
+    return f"gemini-{kind}:{CACHE_VERSION}:{digest}"
+
+@dart_breaker
+def dart_get(path, params):
+    """DART API 호출 → 응답 본문 bytes (파싱하지 않고 그대로 클라이언트에 전달)"""
+    if not DART_API_KEY: return b'{}'
+    params = {**params, 'crtfc_key': DART_API_KEY}
+    res = session.get(f"{DART_API_URL}/{path}", params=params, timeout=15)
+    if res.status_code >= 400: raise UpstreamError('DART', res.status_code)
+    return res.content
+
+def dart_status(raw):
+    """DART 응답 bytes의 status 값 (응답이 '{"status":"000",...'로 시작하면 파싱 없이 확인)"""
+    if raw.startswith(b'{"status":"'): return raw[11:14].decode('ascii')
+    return orjson.loads(raw).get('status')
+
+def dart_get_cached(cache, path, params):
+    """DART API 호출 (정상 응답 / 데이터 없음 응답만 캐시, 메모리 → 디스크 순으로 조회)
+    메모리 캐시에는 (본문, 만료 시각)을 넣어, 디스크에서 올려온 항목도 디스크의 남은 만료 시각까지만 사용"""
+    key = (CACHE_VERSION, path, tuple(sorted(params.items())))
+    with cache_lock:
+        entry = cache.get(key)
+    if entry is not None and entry[1] > time.time(): return entry[0]
+
+    data, expire_at = disk_get(dart_disk_cache, key, expire_time=True)
+    if data is not None:
+        with cache_lock:
+            cache[key] = (data, expire_at)
+        return data
+
+    data = dart_get(path, params)
+    # 000: 정상, 013: 조회된 데이터 없음 (그 외 키 오류/사용한도 초과 등은 캐시하지 않음)
+    if dart_status(data) in ('000', '013'):
+        with cache_lock:
+            cache[key] = (data, time.time() + cache.ttl)
+        disk_set(dart_disk_cache, key, data, expire=cache.ttl)
+    return data
+
+def fetch_finance(code, year):
+    """재무제표 조회 (연결재무제표 우선, 없으면 별도재무제표) → 응답 bytes"""
+    # 1순위: 연결재무제표
+    data = dart_get_cached(finance_cache, 'fnlttSinglAcntAll.json', {'corp_code': code, 'bsns_year': year, 'reprt_code': '11014', 'fs_div': 'CFS'})
+    # 2순위: 별도재무제표 (데이터가 없으면 DART는 013을 주므로 status만 확인)
+    if dart_status(data) != '000':
+        data = dart_get_cached(finance_cache, 'fnlttSinglAcntAll.json', {'corp_code': code, 'bsns_year': year, 'reprt_code': '11014', 'fs_div': 'OFS'})
+    return data
+
+# 서로 독립적인 DART 요청을 동시에 보내기 위한 스레드 풀 (공유 세션의 연결 풀 사용)
+# 요청 하나가 DART 조회 2건(기업개황/재무제표)과 AI 분석 1건을 띄우므로
+# 워커의 동시 요청 수만큼 모두 받아도 큐에서 기다리지 않도록 크기를 맞춤 (gevent에서는 스레드가 greenlet)
+dart_pool = ThreadPoolExecutor(max_workers=2 * WORKER_CONNECTIONS)
+# Gemini 호출은 수십 초 걸릴 수 있으므로 DART 풀을 막지 않도록 따로 둠
+ai_pool = ThreadPoolExecutor(max_workers=WORKER_CONNECTIONS)
+
+@gemini_breaker
+def call_gemini(prompt, timeout=GEMINI_TIMEOUT, until_json=False, schema=None):
+    """Gemini 스트리밍 API 호출 → (HTTP 상태코드, 응답 텍스트)
+    until_json=True면 첫 JSON 객체가 완성되는 즉시 연결을 끊음, schema가 있으면 해당 구조로 출력 강제"""
+    if not GEMINI_STREAM_URL: return None, ""
+    deadline = time.monotonic() + timeout
+    config = GEMINI_GENERATION_CONFIG if schema is None else {**GEMINI_GENERATION_CONFIG, "responseSchema": schema}
+    body = orjson.dumps({"contents": [{"parts": [{"text": prompt}]}], "generationConfig": config})
+    # 생성되는 대로 받아서 텍스트만 뽑아냄 (본문 전체를 메모리에 올리지 않음)
+    # requests의 읽기 timeout은 조각 사이 대기 한도일 뿐이므로 전체 한도는 collect_text에서 확인
+    with session.post(GEMINI_STREAM_URL, data=body, headers=GEMINI_HEADERS, timeout=(5, timeout), stream=True) as res:
+        # 5xx는 예외로 올려 차단기가 장애로 집계하도록 함
+        if res.status_code >= 500: raise UpstreamError('Gemini', res.status_code)
+        if res.status_code != 200: return res.status_code, res.text
+        return res.status_code, collect_text(res, until_json, deadline)
+
+class DeadlineReader:
+    """read()마다 마감 시각을 확인하는 파일 래퍼 (조각이 조금씩 계속 와도 전체 한도를 넘기지 않도록)"""
+    def __init__(self, raw, deadline):
+        self.raw = raw
+        self.deadline = deadline
+
+    def read(self, size=-1):
+        if time.monotonic() > self.deadline: raise TimeoutError("Gemini 응답 시간이 초과되었습니다.")
+        return self.raw.read(size)
+
+def collect_text(res, until_json=False, deadline=None):
+    """streamGenerateContent 응답(응답 객체 배열)에서 텍스트 조각을 이어 붙임 (deadline: time.monotonic() 기준 마감 시각)"""
+    res.raw.decode_content = True  # gzip 등 전송 인코딩 해제
+    stream = res.raw if deadline is None else DeadlineReader(res.raw, deadline)
+    # 응답은 보통 후보 1개/파트 1개이고 조각도 수십 개 수준이므로 리스트+join 없이 바로 이어 붙임
+    # (CPython은 다른 참조가 없는 지역 str의 +=를 제자리에서 늘림)
+    text = ""
+    scanner = JsonObjectScanner() if until_json else None
+    for fragment in ijson.items(stream, 'item.candidates.item.content.parts.item.text'):
+        text += fragment
+        # 첫 JSON 객체가 닫히면 나머지 출력은 받지 않음 (새 조각만 훑으므로 누적 텍스트를 다시 파싱하지 않음)
+        if scanner and scanner.feed(fragment):
+            break
+    return text.strip()
+
+JSON_TOKEN_RE = re.compile(r'[{}"\\]')
+
+class JsonObjectScanner:
+    """조각 단위로 들어오는 텍스트에서 첫 JSON 객체가 닫히는 시점을 감지 (중괄호 깊이 + 문자열/이스케이프 상태만 추적)"""
+    def __init__(self):
+        self.depth = 0
+        self.in_string = False
+        self.skip_next = False  # 조각 끝이 문자열 안의 '\'로 끝난 경우 다음 조각의 첫 문자를 건너뜀
+
+    def feed(self, fragment):
+        """조각을 이어서 훑고, 첫 JSON 객체가 닫혔으면 True"""
+        skip_pos = 0 if self.skip_next else -1
+        self.skip_next = False
+        for m in JSON_TOKEN_RE.finditer(fragment):
+            pos = m.start()
+            if pos == skip_pos: continue
+            ch = m.group()
+            if self.in_string:
+                if ch == '\\':
+                    skip_pos = pos + 1
+                    if skip_pos == len(fragment): self.skip_next = True
+                elif ch == '"':
+                    self.in_string = False
+            elif ch == '"':
+                if self.depth: self.in_string = True
+            elif ch == '{':
+                self.depth += 1
+            elif ch == '}' and self.depth:
+                self.depth -= 1
+                if not self.depth: return True
+        return False
+
+JSON_DECODER = json.JSONDecoder()
+
+def extract_json(text):
+    """첫 번째 JSON 객체를 찾아 파싱 (실패 시 None)"""
+    if not text: return None
+    start = text.find('{')
+    if start == -1: return None
+    # '}'로 끝나면(responseSchema 응답은 대부분 '{ ... }'만 옴) orjson으로 한 번에 파싱
+    # 코드 펜스 등 뒤에 다른 텍스트가 붙은 경우는 raw_decode가 객체 끝에서 멈추므로 한 번의 파싱으로 끝남
+    if text.rstrip().endswith('}'):
+        try:
+            return orjson.loads(text[start:])
+        except orjson.JSONDecodeError:
+            pass
+    try:
+        obj, _ = JSON_DECODER.raw_decode(text, start)
+        return obj
+    except json.JSONDecodeError:
+        return None
+
+def html_to_text(raw_html):
+    """HTML 조각에서 태그를 제거한 텍스트 추출 (libxml2 HTML 파서 사용)"""
+    if not raw_html or not raw_html.strip(): return ""
+    return "".join(t.strip() for t in lxml_html.fragment_fromstring(raw_html, create_parent='div').itertext())
+
+# 뉴스 캐시: 5분 동안은 그대로 사용하고, 이후에는 ETag/Last-Modified로 변경 여부만 확인
+NEWS_FRESH_SECONDS = 300
+news_cache = TTLCache(maxsize=512, ttl=3600)
+
+RSS_PARSER = etree.XMLParser(resolve_entities=False)  # 외부 응답이므로 엔티티 확장 비활성화
+RSS_TOP_ITEMS = etree.XPath('//item[position() <= 5]')  # 상위 5개 기사만 (한 번만 컴파일)
+
+def fetch_google_news(keyword):
+    """구글 뉴스 RSS 가져오기 (안정적)"""
+    cache_key = f"{CACHE_VERSION}:{keyword}"
+    with cache_lock:
+        cached = news_cache.get(cache_key)
+    if cached and time.monotonic() - cached['fetched_at'] < NEWS_FRESH_SECONDS:
+        return cached['items']
+
+    headers = {}
+    if cached:
+        if cached['etag']: headers['If-None-Match'] = cached['etag']
+        if cached['last_modified']: headers['If-Modified-Since'] = cached['last_modified']
+
+    rss_url = f"https://news.google.com/rss/search?q={keyword}&hl=ko&gl=KR&ceid=KR:ko"
+    try:
+        response = session.get(rss_url, headers=headers, timeout=5)
+        if response.status_code == 304 and cached:
+            # 변경 없음: 본문을 다시 받지 않고 캐시 갱신
+            with cache_lock:
+                news_cache[cache_key] = {**cached, 'fetched_at': time.monotonic()}
+            return cached['items']
+        if response.status_code != 200: 
+            logger.error(f"구글 뉴스 접속 실패: {response.status_code}")
+            return []
+        
+        # XML 파싱
+        root = etree.fromstring(response.content, RSS_PARSER)
+        news_list = []
+        for item in RSS_TOP_ITEMS(root):
+            title = item.findtext('title', "제목 없음")
+            link = item.findtext('link', "#")
+            pubDate = item.findtext('pubDate', "")
+            
+            # HTML 태그 제거된 설명글 추출
+            raw_desc = item.findtext('description', "")
+            description = html_to_text(raw_desc)
+
+            news_list.append({
+                "title": title,
+                "description": description[:100] + "...", 
+                "link": link,
+                "pubDate": pubDate
+            })
+        logger.info(f"뉴스 수집 성공: {len(news_list)}개")
+        if news_list:
+            with cache_lock:
+                news_cache[cache_key] = {
+                    'items': news_list,
+                    'etag': response.headers.get('ETag'),
+                    'last_modified': response.headers.get('Last-Modified'),
+                    'fetched_at': time.monotonic(),
+                }
+        return news_list
+    except Exception as e:
+        logger.error(f"뉴스 가져오기 실패: {e}")
+        return []
+
+# ----------------------------
+# 4. 기능별 처리 (app.py의 라우트에서 호출)
+# ----------------------------
+def run_analysis(name, biz):
+    """Gemini 기업 분석 → (응답 dict, HTTP 상태코드)"""
+    prompt = ANALYSIS_PROMPT_TMPL.format(name=name, biz=biz)
+    
+    cache_key = gemini_cache_key('analysis', prompt, ANALYSIS_SCHEMA)
+    cached = disk_get(gemini_cache, cache_key)
+    if cached is not None: return cached, 200
+    
+    try:
+        # responseSchema로 구조화 출력을 강제하므로 JSON 복구 요청은 하지 않음
+        status, text = call_gemini(prompt, until_json=True, schema=ANALYSIS_SCHEMA)
+        if status != 200: return {'error': 'Gemini Error', 'details': text}, 500
+        
+        # 출력 토큰 한도로 잘린 경우 등에만 실패
+        parsed = extract_json(text)
+        if parsed is None: raise ValueError("Gemini 응답에서 JSON을 찾을 수 없습니다.")
+        
+        # 파싱에 성공한 결과만 캐시 (깨진 응답은 다시 요청하도록)
+        disk_set(gemini_cache, cache_key, parsed, expire=GEMINI_CACHE_TTL)
+        return parsed, 200
+            
+    except CircuitBreakerError:
+        return {'error': UPSTREAM_DOWN_MESSAGE}, 503
+    except Exception as e:
+        logger.error(f"분석 에러: {safe_error_message(e)}")
+        return {'error': safe_error_message(e)}, 500
+
+# 응답이 마크다운 코드 펜스(```json, ```html 등)로 감싸여 온 경우 펜스를 한 번에 제거
+CODE_FENCE_RE = re.compile(r'^```[a-z]*\n?|\n?```$', re.M)
+
+def summarize_news(keyword):
+    """구글 뉴스 상위 기사 + Gemini 요약 → 응답 dict"""
+    logger.info(f"뉴스 요청: {keyword}")
+
+    # 1. 구글 뉴스 RSS 가져오기 (실제 데이터)
+    # 요약 프롬프트가 뉴스 제목으로 만들어지므로 뉴스 → Gemini 순서는 병렬화할 수 없음
+    # (요청 간 동시 처리는 gevent 워커가 담당)
+    news_items = fetch_google_news(keyword)
+    
+    # 2. 결과가 없으면 정직하게 반환
+    if not news_items:
+        return {
+            'news_list': [],
+            'ai_summary': f"<b>'{keyword}'에 대한 뉴스 검색 결과가 없습니다.</b><br>검색어를 확인하거나, 기업명을 정확히 입력해주세요."
+        }
+
+    # 3. Gemini 요약 (JSON 파싱 처리 강화)
+    summary = "요약 실패"
+    try:
+        news_text = "\n".join([f"{i+1}. {n['title']}" for i, n in enumerate(news_items)])
+        
+        # JSON으로 달라고 요청
+        prompt = (
+            f"다음 '{keyword}' 관련 뉴스 제목들을 보고 취업 면접 대비용으로 3줄 핵심 요약해줘.\n"
+            "형식: <ul><li>핵심1</li><li>핵심2</li><li>핵심3</li></ul>\n"
+            "반환값은 반드시 다음 JSON 포맷이어야 해: {\"summary\": \"HTML문자열\"}\n"
+            f"뉴스 목록:\n{news_text}"
+        )
+        
+        # 같은 뉴스 목록(키워드 + 제목)이면 이전 요약을 재사용
+        cache_key = gemini_cache_key('news-summary', prompt)
+        cached = disk_get(gemini_cache, cache_key)
+        if cached is not None:
+            return {'news_list': news_items, 'ai_summary': cached}
+        
+        status, raw_json_text = call_gemini(prompt)
+        if status == 200:
+            try:
+                # JSON 파싱 시도
+                parsed_obj = orjson.loads(raw_json_text)
+            except orjson.JSONDecodeError:
+                # 코드 펜스로 감싼 경우: 펜스를 벗긴 뒤 다시 파싱
+                parsed_obj = extract_json(CODE_FENCE_RE.sub('', raw_json_text))
+            if isinstance(parsed_obj, dict) and parsed_obj:
+                # 'summary' 키만 뽑아내기
+                if "summary" in parsed_obj:
+                    summary = parsed_obj["summary"]
+                else:
+                    summary = list(parsed_obj.values())[0]
+                disk_set(gemini_cache, cache_key, summary, expire=GEMINI_CACHE_TTL)
+            else:
+                # 파싱 실패하면 펜스만 벗긴 원본 그대로 사용 (혹시 모르니, 캐시하지 않음)
+                summary = CODE_FENCE_RE.sub('', raw_json_text).strip()
+
+    except Exception as e:
+        logger.error(f"요약 생성 에러: {safe_error_message(e)}")
+
+    return {'news_list': news_items, 'ai_summary': summary}
+
+BUNDLE_STREAM_TIMEOUT = 90  # AI 분석까지 포함한 스트림 전체 대기 한도(초)
+
+def sse_event(event, data):
+    """SSE 이벤트 한 개 (data는 JSON bytes, JSON의 줄바꿈은 공백이므로 한 줄로 펴서 전송)"""
+    return b'event: ' + event.encode() + b'\ndata: ' + data.replace(b'\r', b' ').replace(b'\n', b' ') + b'\n\n'
+
+def bundle_events(code, year, name):
+    """기업개황/재무제표/AI 분석을 동시에 실행하고 끝나는 순서대로 SSE 이벤트(bytes)로 내보내는 제너레이터
+    AI 분석은 업종(induty_code_nm)이 필요하므로 기업개황이 오는 즉시 시작해 재무제표 조회와 겹쳐 실행
+    (뉴스 요약은 화면에서 별도 입력으로 요청하므로 /api/news-summary에서만 처리)"""
+    tasks = {
+        dart_pool.submit(dart_get_cached, company_cache, 'company.json', {'corp_code': code}): 'company',
+        dart_pool.submit(fetch_finance, code, year): 'finance',
+    }
+    deadline = time.monotonic() + BUNDLE_STREAM_TIMEOUT
+    try:
+        while tasks:
+            done, _ = wait(tasks, timeout=max(deadline - time.monotonic(), 0), return_when=FIRST_COMPLETED)
+            if not done: break
+            for fut in done:
+                event = tasks.pop(fut)
+                biz = ''
+                try:
+                    result = fut.result()
+                    if event == 'company': biz = orjson.loads(result).get('induty_code_nm', '')
+                    if event == 'analysis': result = result[0]
+                except CircuitBreakerError:
+                    result = {'status': '503', 'message': UPSTREAM_DOWN_MESSAGE}
+                except Exception as e:
+                    result = {'status': '500', 'message': safe_error_message(e)}
+                if event == 'company': tasks[ai_pool.submit(run_analysis, name, biz)] = 'analysis'
+                # DART 응답은 bytes 그대로, 나머지는 orjson으로 인코딩
+                yield sse_event(event, result if isinstance(result, bytes) else orjson.dumps(result))
+        # 시간 초과: 아직 시작하지 않은 작업은 취소하고 남은 이벤트는 504로 마무리
+        for fut, event in tasks.items():
+            fut.cancel()
+            yield sse_event(event, orjson.dumps({'status': '504', 'error': '응답 시간이 초과되었습니다.'}))
+        yield sse_event('done', b'{}')
+    finally:
+        # 클라이언트가 연결을 끊은 경우(GeneratorExit)에도 대기 중인 Gemini/DART 호출이 나가지 않도록 취소
+        for fut in tasks: fut.cancel()
+
+if __name__ == '__main__':
+    # 빌드 단계에서 실행하면 CORPCODE.pkl을 미리 만들어 두어 첫 기동 때 XML 파싱을 건너뜀
+    # 예) Render 빌드 명령: pip install -r requirements.txt && python helpers.py
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    load_corp_index()
@@ -0,0 +1,116 @@
+# Flask 응답 처리 (JSON 직렬화, 압축, 메인 페이지, DART 응답) - app.py는 라우트 등록만 담당
+import os
+import gzip
+import hashlib
+import threading
+from flask import current_app, request, jsonify
+from flask.json.provider import JSONProvider
+from flask_compress import Compress
+import brotli
+from cachetools import TTLCache
+import orjson
+from helpers import CircuitBreakerError, UPSTREAM_DOWN_MESSAGE, safe_error_message
+
+class OrjsonProvider(JSONProvider):
+    """jsonify / request.get_json 직렬화를 orjson으로 처리"""
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        # str 변환 없이 orjson이 만든 bytes를 그대로 응답 본문으로 사용
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS), mimetype='application/json')
+
+def init_compress(app):
+    """응답 압축: 재무제표 JSON 등 큰 응답을 brotli/gzip으로 (1KB 미만은 압축 이득이 없어 그대로)
+    SSE 스트림은 이벤트가 도착하는 즉시 전달되어야 하므로 압축하지 않음"""
+    app.config['COMPRESS_ALGORITHM'] = ['br', 'gzip']
+    app.config['COMPRESS_MIN_SIZE'] = 1024
+    app.config['COMPRESS_STREAMS'] = False
+    Compress(app)
+
+# DART 응답 압축 결과 캐시: (인코딩, 조회 키) → (원본 bytes, 압축 bytes)
+# flask-compress의 캐시는 모든 응답에 같은 키 함수를 쓰므로 쓰지 않고 raw_json에서 직접 압축
+compressed_cache = TTLCache(maxsize=256, ttl=3600)
+compressed_lock = threading.Lock()
+
+def raw_json(raw, key):
+    """이미 JSON으로 인코딩된 bytes(DART 응답)를 재인코딩 없이 응답
+    key(DART 조회 경로 + 파라미터)가 같고 본문도 같으면 압축 결과를 캐시에서 재사용"""
+    res = current_app.response_class(raw, mimetype='application/json')
+    encoding = request.accept_encodings.best_match(['br', 'gzip'])
+    if encoding is None or len(raw) < current_app.config['COMPRESS_MIN_SIZE']: return res
+    with compressed_lock:
+        entry = compressed_cache.get((encoding, key))
+    # 메모리 캐시의 같은 bytes 객체면 == 가 동일성만 보고 바로 True, 디스크에서 다시 올라온 본문은 memcmp 한 번
+    # (DART 캐시가 만료돼 본문이 바뀌었으면 다시 압축)
+    if entry is not None and entry[0] == raw:
+        body = entry[1]
+    else:
+        if encoding == 'br': body = brotli.compress(raw, quality=current_app.config['COMPRESS_BR_LEVEL'])
+        else: body = gzip.compress(raw, compresslevel=current_app.config['COMPRESS_LEVEL'])
+        with compressed_lock:
+            compressed_cache[(encoding, key)] = (raw, body)
+    # Content-Encoding이 있으면 flask-compress는 건너뜀
+    res.set_data(body)
+    res.headers['Content-Encoding'] = encoding
+    res.vary.add('Accept-Encoding')
+    return res
+
+def dart_response(fetch, key, *args):
+    """fetch(*args)로 받은 DART 응답 bytes를 그대로 응답 (차단기가 열려 있으면 503, 그 외 오류는 500)"""
+    try:
+        return raw_json(fetch(*args), key)
+    except CircuitBreakerError:
+        return jsonify({'status': '503', 'message': UPSTREAM_DOWN_MESSAGE}), 503
+    except Exception as e:
+        return jsonify({'status': '500', 'message': safe_error_message(e)}), 500
+
+# 네이버 검색 노출용 robots.txt / sitemap.xml
+ROBOTS_TXT = "\n".join([
+    "User-agent: *",
+    "Allow: /",
+    "Sitemap: https://notnull.kr/sitemap.xml"  # 도메인 연결 후 실제 주소로 인식됨
+])
+SITEMAP_XML = """<?xml version="1.0" encoding="UTF-8"?>
+    <urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+        <url>
+            <loc>https://notnull.kr/</loc>
+            <lastmod>2025-12-04</lastmod>
+            <priority>1.0</priority>
+        </url>
+    </urlset>"""
+
+# 메인 페이지는 바뀌지 않으므로 시작 시 한 번만 읽어 메모리에서 응답 (요청마다 stat/open 하지 않음)
+try:
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'index.html'), 'rb') as f:
+        INDEX_HTML = f.read()
+    INDEX_ETAG = hashlib.blake2b(INDEX_HTML, digest_size=16).hexdigest()
+    # 인코딩별 본문도 미리 최고 압축률로 만들어 둠 (flask-compress가 요청마다 다시 압축하지 않도록)
+    INDEX_ENCODED = {'br': brotli.compress(INDEX_HTML, quality=11), 'gzip': gzip.compress(INDEX_HTML, compresslevel=9)}
+    INDEX_ERROR = None
+except OSError as e:
+    INDEX_HTML = INDEX_ETAG = INDEX_ENCODED = None
+    INDEX_ERROR = e
+
+def index_response():
+    """메인 페이지 응답 (클라이언트가 받는 인코딩의 미리 압축한 본문, ETag로 304 처리)"""
+    if INDEX_HTML is None:
+        return f"<h3>index.html 파일을 찾을 수 없습니다.</h3><p>app.py와 같은 폴더에 있는지 확인해주세요.<br>에러: {INDEX_ERROR}</p>"
+    encoding = request.accept_encodings.best_match(list(INDEX_ENCODED))
+    if encoding:
+        # Content-Encoding이 있으면 flask-compress는 건너뜀, ETag는 flask-compress와 같은 '<etag>:<인코딩>' 형식
+        res = current_app.response_class(INDEX_ENCODED[encoding], mimetype='text/html')
+        res.headers['Content-Encoding'] = encoding
+        res.set_etag(f"{INDEX_ETAG}:{encoding}")
+    else:
+        res = current_app.response_class(INDEX_HTML, mimetype='text/html')
+        res.set_etag(INDEX_ETAG)
+    res.vary.add('Accept-Encoding')
+    res.cache_control.public = True
+    res.cache_control.max_age = 300
+    # If-None-Match가 같으면 304로 본문 없이 응답
+    return res.make_conditional(request)